@@ -1,9 +1,68 @@
-from playwright.sync_api import sync_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+import asyncio
 import json
 import time
 import os
 import re
-from urllib.parse import urlparse
+from urllib.parse import urlsplit
+
+# Compiled once at import time instead of on every call
+_SAFE_DOMAIN_RE = re.compile(r'[^\w\.-]')
+
+# Login indicators checked against the page URL and title
+URL_LOGIN_INDICATORS = ('login', 'signin', 'sign-in', 'signup', 'sign-up', 'register', 'auth', 'accounts')
+TITLE_LOGIN_INDICATORS = ('login', 'sign in', 'sign up', 'register', 'log in')
+
+# Combined selectors: one comma-joined query returns the first hit across
+# every variant in a single DOM walk, instead of one query per variant.
+LOGIN_BUTTON_SELECTOR = ', '.join([
+    'button:has-text("Log in")',
+    'button:has-text("Sign in")',
+    'button:has-text("Login")',
+    'button:has-text("Log In")',
+    'button:has-text("Sign In")',
+    'a:has-text("Log in")',
+    'a:has-text("Sign in")'
+])
+
+INSTAGRAM_PROFILE_SELECTOR = ', '.join([
+    'header img[alt*="profile picture"]',
+    'section:has-text("posts")',
+    'section:has-text("followers")',
+    'article',
+    'div:has-text("Posts")',
+    'svg[aria-label="Home"]',
+    'svg[aria-label="Profile"]'
+])
+
+FACEBOOK_LOGGED_IN_SELECTOR = ', '.join([
+    'a[aria-label="Home"]',
+    'a[aria-label="Profile"]',
+    'div[role="navigation"]',
+    'svg[aria-label="Notifications"]',
+    'div:has-text("Friends")',
+    'div[aria-label="Your profile"]',
+    'a[href*="/friends/"]'
+])
+
+# JS predicates for wait_for_function: they return true the moment a
+# logged-in indicator appears in the DOM, so login is detected instantly
+# instead of on the next polling tick
+INSTAGRAM_LOGGED_IN_JS = """
+    () => !!(document.querySelector('svg[aria-label="Home"]')
+          || document.querySelector('svg[aria-label="Profile"]')
+          || document.querySelector('header img[alt*="profile picture"]'))
+"""
+
+FACEBOOK_LOGGED_IN_JS = """
+    () => !!(document.querySelector('a[aria-label="Home"]')
+          || document.querySelector('div[role="navigation"]')
+          || document.querySelector('svg[aria-label="Notifications"]'))
+"""
+
+GENERIC_LOGGED_IN_JS = """
+    () => !document.querySelector('input[type="password"]')
+"""
 
 class AuthHandler:
     """Universal authentication handler for any website"""
@@ -11,118 +70,168 @@ class AuthHandler:
     def __init__(self, cookie_dir="cookies"):
         self.cookie_dir = cookie_dir
         os.makedirs(cookie_dir, exist_ok=True)
+        # Cookie file paths per URL — load/save/handle_authentication all
+        # ask for the same path, so parse and sanitize only once
+        self._cookie_path_cache = {}
+        # Hash of the cookies last loaded/saved per URL, so unchanged
+        # cookies aren't rewritten to disk
+        self._last_cookie_hash = {}
+        # Memoized login-check results, keyed by a document fingerprint
+        self._last_login_required = None
+        self._last_logged_in = None
+        # Manual logins need the browser window, so only one page may
+        # authenticate at a time when URLs are scraped concurrently
+        self._auth_lock = asyncio.Lock()
+
+    async def _doc_key(self, page):
+        """
+        Fingerprint of the current document, used to memoize login checks
+        Returns None if the page is navigating and can't be fingerprinted
+        """
+        try:
+            return (page.url, await page.evaluate("document.body ? document.body.childElementCount : -1"))
+        except Exception:
+            return None
+
+    def _clear_check_cache(self):
+        """Drop memoized login-check results (call after navigation)"""
+        self._last_login_required = None
+        self._last_logged_in = None
     
     def _get_domain_key(self, url):
         """Extract domain from URL to use as cookie filename"""
-        parsed = urlparse(url)
+        parsed = urlsplit(url)
         domain = parsed.netloc.replace('www.', '').split(':')[0]
         return domain
     
     def _get_cookie_file(self, url):
-        """Get cookie file path for a given URL"""
-        domain = self._get_domain_key(url)
-        safe_domain = re.sub(r'[^\w\.-]', '_', domain)
-        return os.path.join(self.cookie_dir, f"{safe_domain}_cookies.json")
+        """Get cookie file path for a given URL (cached per URL)"""
+        cookie_file = self._cookie_path_cache.get(url)
+        if cookie_file is None:
+            domain = self._get_domain_key(url)
+            safe_domain = _SAFE_DOMAIN_RE.sub('_', domain)
+            cookie_file = os.path.join(self.cookie_dir, f"{safe_domain}_cookies.json")
+            self._cookie_path_cache[url] = cookie_file
+        return cookie_file
     
-    def load_cookies(self, context, url):
+    async def load_cookies(self, context, url):
         """Load saved cookies for a specific site"""
         cookie_file = self._get_cookie_file(url)
-        
+
         if os.path.exists(cookie_file):
             try:
                 with open(cookie_file, 'r') as f:
                     cookies = json.load(f)
-                context.add_cookies(cookies)
+                await context.add_cookies(cookies)
+                self._last_cookie_hash[url] = hash(self._canonical_cookie_json(cookies))
                 print(f"Loaded {len(cookies)} cookies from {cookie_file}")
                 return True
             except Exception as e:
                 print(f"Error loading cookies: {e}")
         return False
-    
-    def save_cookies(self, context, url):
-        """Save cookies for a specific site"""
+
+    @staticmethod
+    def _canonical_cookie_json(cookies):
+        """Serialize cookies deterministically for hashing and storage"""
+        return json.dumps(cookies, sort_keys=True, separators=(',', ':'))
+
+    async def save_cookies(self, context, url):
+        """Save cookies for a specific site (skips the write if unchanged)"""
         cookie_file = self._get_cookie_file(url)
-        cookies = context.cookies()
-        
-        with open(cookie_file, 'w') as f:
-            json.dump(cookies, f, indent=2)
-        
+        # The context is shared across all URLs, so ask only for this
+        # site's cookies — dumping every cookie in the context would leak
+        # other sites' sessions into this domain's file
+        cookies = await context.cookies(urls=[url])
+
+        payload = self._canonical_cookie_json(cookies)
+        cookie_hash = hash(payload)
+        if self._last_cookie_hash.get(url) == cookie_hash:
+            print(" Cookies unchanged, skipping write")
+            return cookies
+
+        # Write to a temp file and rename so a crash mid-write can't
+        # truncate the existing cookie store
+        tmp_file = f"{cookie_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(payload)
+        os.replace(tmp_file, cookie_file)
+        self._last_cookie_hash[url] = cookie_hash
+
         print(f"\n Saved {len(cookies)} cookies to {cookie_file}")
         return cookies
     
-    def is_login_required(self, page):
+    async def is_login_required(self, page):
         """
         Universal login detection for any website
         Returns True if login/signup is detected, False if page seems accessible
         Handles navigation errors gracefully
+
+        Results are memoized per document, so repeated checks against an
+        unchanged page skip the selector walk
         """
-        
+        doc_key = await self._doc_key(page)
+        if doc_key is not None and self._last_login_required and self._last_login_required[0] == doc_key:
+            return self._last_login_required[1]
+
+        result = await self._check_login_required(page)
+        if doc_key is not None:
+            self._last_login_required = (doc_key, result)
+        return result
+
+    async def _check_login_required(self, page):
+        """Uncached login detection (see is_login_required)"""
+
         try:
             # SPECIAL CASE: Instagram login page detection
             try:
-                instagram_login = page.query_selector('text="Sign up for Instagram"')
+                instagram_login = await page.query_selector('text="Sign up for Instagram"')
                 if instagram_login:
                     print(" Instagram signup prompt detected")
                     return True
             except Exception:
                 # Page navigated during check, continue
                 pass
-            
+
             # Check for login form (username + password fields)
             try:
-                username_field = page.query_selector('input[name="username"]')
-                password_field = page.query_selector('input[type="password"]')
-                
+                username_field = await page.query_selector('input[name="username"]')
+                password_field = await page.query_selector('input[type="password"]')
+
                 if username_field and password_field:
                     print(" Login form detected (username + password fields)")
                     return True
             except Exception:
                 pass
-            
+
             # Check page URL for login patterns
             try:
                 url_lower = page.url.lower()
-                url_login_indicators = ['login', 'signin', 'sign-in', 'signup', 'sign-up', 'register', 'auth', 'accounts']
-                for indicator in url_login_indicators:
-                    if indicator in url_lower:
-                        print(f" Login indicator in URL: {indicator}")
-                        return True
+                if any(indicator in url_lower for indicator in URL_LOGIN_INDICATORS):
+                    print(" Login indicator in URL")
+                    return True
             except Exception:
                 pass
-            
+
             # Check page title
             try:
-                title = page.title().lower()
-                title_indicators = ['login', 'sign in', 'sign up', 'register', 'log in']
-                for indicator in title_indicators:
-                    if indicator in title:
-                        print(f" Login indicator in title: {indicator}")
-                        return True
+                title = (await page.title()).lower()
+                if any(indicator in title for indicator in TITLE_LOGIN_INDICATORS):
+                    print(" Login indicator in title")
+                    return True
             except Exception:
                 pass
-            
-            # Check for login buttons
-            login_buttons = [
-                'button:has-text("Log in")',
-                'button:has-text("Sign in")',
-                'button:has-text("Login")',
-                'button:has-text("Log In")',
-                'button:has-text("Sign In")',
-                'a:has-text("Log in")',
-                'a:has-text("Sign in")'
-            ]
-            
-            for selector in login_buttons:
-                try:
-                    if page.query_selector(selector):
-                        print(f"🔍 Login button detected: {selector}")
-                        return True
-                except Exception:
-                    continue
-            
+
+            # Check for login buttons (single combined query)
+            try:
+                if await page.query_selector(LOGIN_BUTTON_SELECTOR):
+                    print("🔍 Login button detected")
+                    return True
+            except Exception:
+                pass
+
             # Check for "Create new account" or similar
             try:
-                signup_links = page.query_selector('a:has-text("Create new account")')
+                signup_links = await page.query_selector('a:has-text("Create new account")')
                 if signup_links:
                     print(" Create new account link detected")
                     return True
@@ -135,63 +244,54 @@ class AuthHandler:
         
         return False
     
-    def is_logged_in(self, page, original_url):
+    async def is_logged_in(self, page, original_url):
         """
         Check if we're actually logged in and on a content page
         Handles navigation errors gracefully
+
+        Results are memoized per document, same as is_login_required
         """
+        doc_key = await self._doc_key(page)
+        if doc_key is not None and self._last_logged_in and self._last_logged_in[0] == (doc_key, original_url):
+            return self._last_logged_in[1]
+
+        result = await self._check_logged_in(page, original_url)
+        if doc_key is not None:
+            self._last_logged_in = ((doc_key, original_url), result)
+        return result
+
+    async def _check_logged_in(self, page, original_url):
+        """Uncached logged-in detection (see is_logged_in)"""
         try:
             # First, if login is required, we're not logged in
             try:
-                if self.is_login_required(page):
+                if await self.is_login_required(page):
                     return False
             except Exception:
                 # If we can't even check, assume not logged in
                 return False
-            
+
             # For Instagram specifically, check for profile elements
             if 'instagram.com' in original_url:
-                profile_indicators = [
-                    'header img[alt*="profile picture"]',
-                    'section:has-text("posts")',
-                    'section:has-text("followers")',
-                    'article',
-                    'div:has-text("Posts")',
-                    'svg[aria-label="Home"]',
-                    'svg[aria-label="Profile"]'
-                ]
-                
-                for selector in profile_indicators:
-                    try:
-                        if page.query_selector(selector):
-                            print(f" Found profile indicator: {selector}")
-                            return True
-                    except Exception:
-                        continue
-            
+                try:
+                    if await page.query_selector(INSTAGRAM_PROFILE_SELECTOR):
+                        print(" Found profile indicator")
+                        return True
+                except Exception:
+                    pass
+
             # For Facebook specifically
             if 'facebook.com' in original_url:
-                fb_indicators = [
-                    'a[aria-label="Home"]',
-                    'a[aria-label="Profile"]',
-                    'div[role="navigation"]',
-                    'svg[aria-label="Notifications"]',
-                    'div:has-text("Friends")',
-                    'div[aria-label="Your profile"]',
-                    'a[href*="/friends/"]'
-                ]
-                
-                for selector in fb_indicators:
-                    try:
-                        if page.query_selector(selector):
-                            print(f"🔍 Found Facebook logged-in indicator: {selector}")
-                            return True
-                    except Exception:
-                        continue
-            
+                try:
+                    if await page.query_selector(FACEBOOK_LOGGED_IN_SELECTOR):
+                        print("🔍 Found Facebook logged-in indicator")
+                        return True
+                except Exception:
+                    pass
+
             # Generic check
             try:
-                return not self.is_login_required(page)
+                return not await self.is_login_required(page)
             except Exception:
                 return False
                 
@@ -199,25 +299,42 @@ class AuthHandler:
             print(f" Error checking logged-in status: {e}")
             return False
     
-    def handle_authentication(self, page, context, original_url, timeout=60):
+    def _logged_in_predicate(self, url):
+        """Pick the JS logged-in predicate for a given site"""
+        if 'instagram.com' in url:
+            return INSTAGRAM_LOGGED_IN_JS
+        if 'facebook.com' in url:
+            return FACEBOOK_LOGGED_IN_JS
+        return GENERIC_LOGGED_IN_JS
+
+    async def handle_authentication(self, page, context, original_url, timeout=60):
         """
         Handle authentication for any website
         Returns True if authenticated successfully, False otherwise
+
+        Serialized with a lock: manual logins happen in the shared browser
+        window, so concurrent scrapes take turns here
         """
-        
+        async with self._auth_lock:
+            return await self._handle_authentication(page, context, original_url, timeout)
+
+    async def _handle_authentication(self, page, context, original_url, timeout):
+        """Unserialized authentication flow (see handle_authentication)"""
+
         print(f"\n Checking authentication for: {original_url}")
-        
+
         # First, try to load existing cookies
-        cookies_loaded = self.load_cookies(context, original_url)
-        
+        cookies_loaded = await self.load_cookies(context, original_url)
+
         # Go to the original URL
         print(f" Navigating to: {original_url}")
-        page.goto(original_url)
-        time.sleep(5)  # Increased wait time
-        
+        await page.goto(original_url)
+        self._clear_check_cache()
+        await asyncio.sleep(5)  # Increased wait time
+
         # Check if we're already logged in and on content page
         try:
-            if self.is_logged_in(page, original_url):
+            if await self.is_logged_in(page, original_url):
                 print(" Already logged in! No authentication needed.")
                 return True
         except Exception as e:
@@ -241,26 +358,28 @@ class AuthHandler:
         print("   • Don't close the browser window during login")
         print("\n" + "="*60)
         
-        # Countdown timer with periodic login check
+        # Wait for the logged-in indicator to appear in the DOM — this fires
+        # the instant the page changes instead of on the next polling tick
+        predicate = self._logged_in_predicate(original_url)
+        # monotonic is immune to wall-clock adjustments mid-wait
+        start = time.monotonic()
+        deadline = start + timeout
         logged_in = False
-        for i in range(timeout, 0, -1):
-            # Check every 3 seconds if login was successful
-            if i % 3 == 0:
-                try:
-                    if self.is_logged_in(page, original_url):
-                        print(f"\n Login detected at {timeout - i} seconds!")
-                        logged_in = True
-                        break
-                except Exception as e:
-                    # Page probably navigated, continue waiting
-                    pass
-                
-                if i % 9 == 0:  # Every 9 seconds, remind user
-                    print(f"\n Still waiting for login... {i} seconds remaining")
-            
-            print(f"   Waiting... {i:2d} seconds remaining", end='\r')
-            time.sleep(1)
-        
+
+        while time.monotonic() < deadline:
+            remaining_ms = max((deadline - time.monotonic()) * 1000, 1)
+            try:
+                await page.wait_for_function(predicate, timeout=remaining_ms)
+                print(f"\n Login detected after {time.monotonic() - start:.0f} seconds!")
+                logged_in = True
+                break
+            except PlaywrightTimeoutError:
+                break
+            except Exception:
+                # Login navigation destroyed the execution context — the wait
+                # must be re-armed on the new document
+                await asyncio.sleep(1)
+
         print("\n")
         
         if logged_in:
@@ -268,42 +387,44 @@ class AuthHandler:
             print(f"Navigating to target page: {original_url}")
             
             # Small delay to let everything settle
-            time.sleep(2)
-            
+            await asyncio.sleep(2)
+
             try:
-                page.goto(original_url)
-                time.sleep(5)
+                await page.goto(original_url)
+                await asyncio.sleep(5)
             except Exception as e:
                 print(f"Navigation error: {e}")
-                time.sleep(3)
+                await asyncio.sleep(3)
                 # Try one more time
                 try:
-                    page.goto(original_url)
-                    time.sleep(5)
+                    await page.goto(original_url)
+                    await asyncio.sleep(5)
                 except:
                     pass
-            
+            self._clear_check_cache()
+
             # Final verification with retry
             max_retries = 3
             for attempt in range(max_retries):
                 try:
-                    if self.is_logged_in(page, original_url):
+                    if await self.is_logged_in(page, original_url):
                         print("Successfully reached target page!")
-                        
+
                         # Save the new cookies
-                        self.save_cookies(context, original_url)
+                        await self.save_cookies(context, original_url)
                         print(" New cookies saved for future sessions!")
                         return True
                 except Exception as e:
                     print(f" Verification attempt {attempt + 1} failed: {e}")
-                
+
                 if attempt < max_retries - 1:
-                    time.sleep(2)
+                    await asyncio.sleep(2)
                     try:
-                        page.goto(original_url)
-                        time.sleep(3)
+                        await page.goto(original_url)
+                        await asyncio.sleep(3)
                     except:
                         pass
+                    self._clear_check_cache()
             
             print(" Could not verify login on target page.")
             return False
@@ -1,33 +1,46 @@
 # from dotenv import load_dotenv
 # load_dotenv()
-import json 
+import asyncio
+import json
 from google import genai
 import glob
 import os
 import re
-import time
 
 # Import all functions from web_scraper.py
-from web_scraper_universal_new import run, get_multiple_urls, sync_playwright
+from web_scraper_universal_new import run, get_multiple_urls, async_playwright, create_browser_context
 
 # client = genai.Client()
 
+# How many pages may be scraped at the same time
+MAX_CONCURRENT_PAGES = 3
+
 # Get multiple URLs from user
 urls = get_multiple_urls()
 
-# Process each URL one by one
-for i, url in enumerate(urls):
-   
-    print(f"Processing URL {i+1} of {len(urls)}: {url}")
-  
-    
-    with sync_playwright() as playwright:
-        run(playwright, url, True, url_index=i+1, total_urls=len(urls))
-    
-    # Small pause between URLs (except after the last one)
-    if i < len(urls) - 1:
-        print(f"\n⏸  Pausing for 3 seconds before next URL...")
-        time.sleep(3)
+
+async def main():
+    # One browser/context for the whole session — each URL gets its own page,
+    # but startup cost and HTTP/TLS/DNS caches are shared across URLs
+    async with async_playwright() as playwright:
+        browser, context = await create_browser_context(playwright)
+
+        # Scraping is I/O-bound, so URLs run concurrently up to the
+        # semaphore limit; logins are still serialized by the auth handler
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_PAGES)
+
+        async def scrape(i, url):
+            async with semaphore:
+                print(f"Processing URL {i+1} of {len(urls)}: {url}")
+                await run(context, url, True, url_index=i+1, total_urls=len(urls))
+
+        await asyncio.gather(*(scrape(i, url) for i, url in enumerate(urls)))
+
+        await context.close()
+        await browser.close()
+
+
+asyncio.run(main())
 
 print(f"\n{'='*60}")
 print(" All URLs processed successfully!")
@@ -1,77 +1,104 @@
 import re
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+import asyncio
 import json
-from urllib.parse import urljoin
-import time
-import os
+from pathlib import Path
+from urllib.parse import urlsplit
 from auth_handler import AuthHandler
 
 # Initialize auth handler
 auth_handler = AuthHandler()
 
+# Compiled once at import time instead of on every call
+_SAFE_FILENAME_RE = re.compile(r"[^\w\s-]")
+
+# Social media platforms matched against link URLs, as one alternation
+# instead of one substring scan per platform per link
+_SOCIAL_RE = re.compile(r"facebook|twitter|instagram|linkedin|youtube|tiktok", re.I)
+
+# Resource types the scraper doesn't need when it isn't screenshotting —
+# the images JSON only records src attributes, never the bytes
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "stylesheet"}
+
 # ===== ALL FUNCTION DEFINITIONS FIRST =====
 
-def __safe_filename_from(title):
-    """Convert title to safe filename (without extension)"""
-    safe_title = re.sub(r"[^\w\s-]", "", title).strip().replace(" ", "_")
-    return safe_title
+async def __block_heavy_resources(route):
+    """Abort image/font/media/stylesheet requests, let everything else through"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def __wait_for_page_settled(page, timeout=30000):
+    """
+    Wait until the network goes quiet instead of sleeping a fixed pad
 
+    Some pages (long-polling, analytics beacons) never reach networkidle;
+    fall back to the load event so we don't hang on them.
+    """
+    try:
+        await page.wait_for_load_state('networkidle', timeout=timeout)
+    except PlaywrightTimeoutError:
+        await page.wait_for_load_state('load')
 
-def __create_page_folder(title):
-    """Create a folder for all data related to this page"""
-    base_name = __safe_filename_from(title)
-    folder_name = f"{base_name}_data"
-    os.makedirs(folder_name, exist_ok=True)
-    return folder_name
 
+def __write_json(obj, filename):
+    """
+    Write compact JSON in one pass
 
-def __ensure_screenshot_folder(base_filename):
-    """Create and return path to screenshot folder"""
-    folder_name = f"{base_filename}_screenshots"
-    os.makedirs(folder_name, exist_ok=True)
-    return folder_name
+    These files are consumed by tooling, not read by hand — skipping
+    indent avoids the pretty-printer recursion and shrinks link/image
+    dumps considerably on heavy pages.
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def __safe_filename_from(title):
+    """Convert title to safe filename (without extension)"""
+    safe_title = _SAFE_FILENAME_RE.sub("", title).strip().replace(" ", "_")
+    return safe_title
 
 
-def __save_page_text(page, selector, folder_path):
+async def __save_page_text(page, selector, folder_path, title, url):
     """Save page text to file in specified folder"""
-    title = page.title()
-    content = page.query_selector(selector)
+    content = await page.query_selector(selector)
     text = (
-        content.inner_text() if content else "No requested selector found"
+        await content.inner_text() if content else "No requested selector found"
     )
 
-    filename = os.path.join(folder_path, f"page_text.txt")
+    filename = folder_path / "page_text.txt"
 
     with open(filename, "w", encoding="utf-8") as f:
         f.write(f"Title: {title}\n")
-        f.write(f"URL: {page.url}\n\n")
+        f.write(f"URL: {url}\n\n")
         f.write(text)
 
     print(f"📄 Page text saved to {filename}")
 
 
-def __capture_multiple_screenshots(page, overlap_percent=20):
+async def __capture_multiple_screenshots(page, screenshot_folder, overlap_percent=20, include_full_page=False):
     """
     Take screenshots while scrolling until the page ends, with configurable overlap
-    
+
     Args:
         page: Playwright page object
+        screenshot_folder: Pre-created folder the screenshots are written to
         overlap_percent: Percentage of overlap between consecutive screenshots (default 20%)
                        Higher overlap = more screenshots, smoother transitions
-    
+        include_full_page: Also render one full-page reference shot (default off —
+                       the scrolled screenshots already cover the page, and
+                       tile-rendering long pages is expensive)
+
     Returns:
         Path to screenshot folder
     """
-    
-    # Get the page title for filename base
-    base_filename = __safe_filename_from(page.title())
-    
-    # Create screenshot folder
-    screenshot_folder = __ensure_screenshot_folder(base_filename)
+
     print(f"\n📁 Saving screenshots to: {screenshot_folder}/")
     
     # Get page dimensions
-    page_height = page.evaluate("document.body.scrollHeight")
+    page_height = await page.evaluate("document.body.scrollHeight")
     viewport_height = page.viewport_size['height']
     
     print(f"\n📏 Page height: {page_height}px, Viewport height: {viewport_height}px")
@@ -100,13 +127,16 @@ def __capture_multiple_screenshots(page, overlap_percent=20):
         
         # Scroll to position
         if current_scroll > 0:
-            page.evaluate(f"window.scrollTo({{top: {current_scroll}, behavior: 'smooth'}})")
+            # Jump instantly — a smooth scroll animates for longer than the
+            # settle below and screenshots would catch it mid-animation
+            await page.evaluate(f"window.scrollTo(0, {current_scroll})")
             print(f"  📍 Scrolling to position {current_scroll}px...")
-            time.sleep(1)  # Wait for scroll to complete and content to load
-        
+            # Give lazy-loaded images a moment to come in
+            await asyncio.sleep(0.3)
+
         # Take screenshot
-        filename = os.path.join(screenshot_folder, f"screenshot_{screenshot_count}.png")
-        page.screenshot(path=filename, full_page=False)
+        filename = screenshot_folder / f"screenshot_{screenshot_count}.png"
+        await page.screenshot(path=filename, full_page=False)
         print(f"  ✅ Screenshot {screenshot_count} saved")
         
         # Move down by step_size for next screenshot
@@ -118,43 +148,99 @@ def __capture_multiple_screenshots(page, overlap_percent=20):
         
         # Scroll to the very bottom
         final_scroll = page_height - viewport_height
-        page.evaluate(f"window.scrollTo({{top: {final_scroll}, behavior: 'smooth'}})")
+        await page.evaluate(f"window.scrollTo(0, {final_scroll})")
         print(f"  📍 Scrolling to bottom at {final_scroll}px...")
-        time.sleep(1)
-        
+        await asyncio.sleep(0.3)
+
         # Take final screenshot
-        filename = os.path.join(screenshot_folder, f"screenshot_{screenshot_count}.png")
-        page.screenshot(path=filename, full_page=False)
+        filename = screenshot_folder / f"screenshot_{screenshot_count}.png"
+        await page.screenshot(path=filename, full_page=False)
         print(f"  ✅ Screenshot {screenshot_count} (bottom) saved")
     
-    # Full page screenshot for reference
-    full_filename = os.path.join(screenshot_folder, "full_page.png")
-    page.screenshot(path=full_filename, full_page=True)
-    print(f"\n📸 Full page screenshot saved")
+    # Optional full page screenshot for reference — JPEG encodes much
+    # faster and smaller than PNG for a shot this large
+    if include_full_page:
+        full_filename = screenshot_folder / "full_page.jpg"
+        await page.screenshot(path=full_filename, full_page=True, type='jpeg', quality=70)
+        print(f"\n📸 Full page screenshot saved")
     print(f"📁 Total screenshots taken: {screenshot_count}")
     print(f"📁 All screenshots in: {screenshot_folder}/")
     
     return screenshot_folder
 
 
-def __scrape_headlines(page, folder_path):
-    """Extract all headlines and save to folder"""
-    headlines = []
-    
-    # Add small wait to ensure page is stable
-    time.sleep(1)
-    
-    for heading_type in ['h1', 'h2', 'h3']:
-        elements = page.query_selector_all(heading_type)
-        for elem in elements:
-            headlines.append({
-                'type': heading_type,
-                'text': elem.inner_text().strip()
-            })
-    
-    filename = os.path.join(folder_path, "headlines.json")
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(headlines, f, indent=2, ensure_ascii=False)
+async def __snapshot_dom(page):
+    """
+    Extract headlines, metadata, images, and links in ONE page.evaluate call
+
+    A single JS pass over the DOM returns everything as one JSON payload,
+    so the DOM is walked once and there is one round-trip for the whole
+    scrape instead of one per stage (or per element).
+    """
+    return await page.evaluate("""
+        () => {
+            // Headlines — one combined selector keeps document order
+            const headlines = Array.from(document.querySelectorAll('h1, h2, h3')).map(h => (
+                {type: h.tagName.toLowerCase(), text: h.innerText.trim()}
+            ));
+
+            // Metadata — direct property reads with optional chaining
+            const q = s => document.querySelector(s);
+            const og = {};
+            document.querySelectorAll('meta[property^="og:"]').forEach(m => {
+                const property = m.getAttribute('property');
+                const content = m.getAttribute('content');
+                if (property && content) og[property] = content;
+            });
+            const meta = {
+                title: document.title,
+                url: location.href,
+                description: q('meta[name="description"]')?.content || null,
+                keywords: q('meta[name="keywords"]')?.content || null,
+                author: q('meta[name="author"]')?.content || null,
+                og_tags: og,
+                canonical: q('link[rel="canonical"]')?.href || null,
+                language: document.documentElement.lang || null
+            };
+
+            // Images
+            const images = Array.from(document.querySelectorAll('img')).map((img, i) => {
+                const rect = img.getBoundingClientRect();
+                return {
+                    index: i,
+                    src: img.src,
+                    alt: img.alt || 'No alt text',
+                    width: img.getAttribute('width'),
+                    height: img.getAttribute('height'),
+                    rendered_width: rect.width,
+                    rendered_height: rect.height,
+                    visible: !!(rect.width && rect.height)
+                };
+            });
+
+            // Links
+            const links = Array.from(document.querySelectorAll('a')).map(a => {
+                const rect = a.getBoundingClientRect();
+                return {
+                    href: a.getAttribute('href'),
+                    abs: a.href,
+                    text: (a.innerText || '').trim(),
+                    rel: a.getAttribute('rel'),
+                    target: a.getAttribute('target'),
+                    visible: !!(rect.width && rect.height),
+                    nav: !!(a.closest('nav') || a.closest('header') || a.closest('footer'))
+                };
+            });
+
+            return {headlines: headlines, meta: meta, images: images, links: links};
+        }
+    """)
+
+
+def __scrape_headlines(headlines, folder_path):
+    """Save headlines from the DOM snapshot to folder"""
+    filename = folder_path / "headlines.json"
+    __write_json(headlines, filename)
     
     print(f"📰 Found {len(headlines)} headlines, saved to {filename}")
     print("\n HEADLINES FOUND:")
@@ -164,48 +250,15 @@ def __scrape_headlines(page, folder_path):
     return headlines
 
 
-def __scrape_images(page, base_url, folder_path):
-    """Extract all images and their metadata, save to folder"""
-    images = []
-    
-    # Find all img elements
-    img_elements = page.query_selector_all('img')
-    
-    for i, img in enumerate(img_elements):
-        # Get basic attributes
-        src = img.get_attribute('src')
-        alt = img.get_attribute('alt') or "No alt text"
-        width = img.get_attribute('width')
-        height = img.get_attribute('height')
-        
-        # Skip if no src
-        if not src:
-            continue
-            
-        # Convert relative URLs to absolute
-        if not src.startswith(('http://', 'https://')):
-            src = urljoin(base_url, src)
-        
-        # Get image dimensions
-        bounding_box = img.bounding_box()
-        
-        image_info = {
-            'index': i,
-            'src': src,
-            'alt': alt,
-            'width': width,
-            'height': height,
-            'rendered_width': bounding_box['width'] if bounding_box else None,
-            'rendered_height': bounding_box['height'] if bounding_box else None,
-            'visible': img.is_visible()
-        }
-        
-        images.append(image_info)
-    
+def __scrape_images(raw_images, folder_path):
+    """Save image metadata from the DOM snapshot to folder"""
+
+    # Skip images without a src, same as before
+    images = [img for img in raw_images if img['src']]
+
     # Save image metadata
-    filename = os.path.join(folder_path, "images.json")
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(images, f, indent=2, ensure_ascii=False)
+    filename = folder_path / "images.json"
+    __write_json(images, filename)
     
     print(f"🖼️  Found {len(images)} images, metadata saved to {filename}")
     
@@ -217,118 +270,68 @@ def __scrape_images(page, base_url, folder_path):
     return images
 
 
-def __scrape_metadata(page, folder_path):
-    """Extract all meta tags and save to folder"""
-    metadata = {}
-    
-    metadata['title'] = page.title()
-    metadata['url'] = page.url
-    
-    # Description meta
-    description = page.query_selector('meta[name="description"]')
-    metadata['description'] = description.get_attribute('content') if description else None
-    
-    # Keywords meta
-    keywords = page.query_selector('meta[name="keywords"]')
-    metadata['keywords'] = keywords.get_attribute('content') if keywords else None
-    
-    # Author meta
-    author = page.query_selector('meta[name="author"]')
-    metadata['author'] = author.get_attribute('content') if author else None
-    
-    # Open Graph tags
-    og_tags = page.query_selector_all('meta[property^="og:"]')
-    metadata['og_tags'] = {}
-    for tag in og_tags:
-        property_name = tag.get_attribute('property')
-        content = tag.get_attribute('content')
-        if property_name and content:
-            metadata['og_tags'][property_name] = content
-    
-    # Canonical URL
-    canonical = page.query_selector('link[rel="canonical"]')
-    metadata['canonical'] = canonical.get_attribute('href') if canonical else None
-    
-    # Language
-    html_tag = page.query_selector('html')
-    metadata['language'] = html_tag.get_attribute('lang') if html_tag else None
-    
+def __scrape_metadata(metadata, folder_path):
+    """Save metadata from the DOM snapshot to folder"""
+
     # Save metadata
-    filename = os.path.join(folder_path, "metadata.json")
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    filename = folder_path / "metadata.json"
+    __write_json(metadata, filename)
     
     print(f"📋 Metadata saved to {filename}")
     return metadata
 
 
-def __scrape_all_links(page, base_url, folder_path):
-    """Extract all links and save to folder"""
+def __scrape_all_links(raw_links, base_url, folder_path):
+    """Categorize and save links from the DOM snapshot to folder"""
     links = {
         'internal': [],
         'external': [],
         'navigation': [],
         'social': []
     }
-    
-    all_links = page.query_selector_all('a')
-    
-    # Social media patterns
-    social_patterns = ['facebook', 'twitter', 'instagram', 'linkedin', 'youtube', 'tiktok']
-    
-    for link in all_links:
-        href = link.get_attribute('href')
-        text = link.inner_text().strip()
-        rel = link.get_attribute('rel')
-        target = link.get_attribute('target')
-        
-        if not href:
+
+    # Parse the base domain once, not per link
+    base_netloc = urlsplit(base_url).netloc
+
+    # Categorization is pure string work, so it stays in Python
+    for raw in raw_links:
+        if not raw['href']:
             continue
-            
-        # Convert to absolute URL
-        if not href.startswith(('http://', 'https://', 'mailto:', 'tel:')):
-            href = urljoin(base_url, href)
-        
+
+        # a.href in the browser already resolves relative URLs to absolute
+        href = raw['abs'] if not raw['href'].startswith(('mailto:', 'tel:')) else raw['href']
+        text = raw['text']
+
         link_info = {
             'url': href,
             'text': text[:100] if text else None,
-            'rel': rel,
-            'target': target,
-            'is_visible': link.is_visible()
+            'rel': raw['rel'],
+            'target': raw['target'],
+            'is_visible': raw['visible']
         }
-        
-        # Categorize
+
+        # Categorize — compare netlocs so a base domain appearing in a
+        # query string doesn't count as internal
         if href.startswith(('mailto:', 'tel:')):
             links['external'].append(link_info)
-        elif base_url.split('/')[2] in href:
+        elif urlsplit(href).netloc == base_netloc:
             links['internal'].append(link_info)
         else:
             links['external'].append(link_info)
-        
+
         # Check social
-        for pattern in social_patterns:
-            if pattern in href.lower():
-                links['social'].append(link_info)
-                break
-        
+        if _SOCIAL_RE.search(href):
+            links['social'].append(link_info)
+
         # Check navigation
-        parent = link.evaluate('''
-            element => {
-                const nav = element.closest('nav');
-                const header = element.closest('header');
-                const footer = element.closest('footer');
-                return !!(nav || header || footer);
-            }
-        ''')
-        if parent:
+        if raw['nav']:
             links['navigation'].append(link_info)
-    
+
     # Save links
-    filename = os.path.join(folder_path, "links.json")
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(links, f, indent=2, ensure_ascii=False)
+    filename = folder_path / "links.json"
+    __write_json(links, filename)
     
-    print(f"🔗 Found {len(all_links)} links, saved to {filename}")
+    print(f"🔗 Found {len(raw_links)} links, saved to {filename}")
     print(f"   - Internal: {len(links['internal'])}")
     print(f"   - External: {len(links['external'])}")
     print(f"   - Social: {len(links['social'])}")
@@ -351,22 +354,29 @@ def get_multiple_urls():
     print("Press Enter twice (empty line) when done.\n")
     
     urls = []
+    seen = set()
     count = 1
-    
+
     while True:
         url = input(f"URL {count}: ").strip()
-        
+
         if not url:  # Empty line means done
             if not urls:  # If no URLs entered yet
                 print(" Please enter at least one URL.")
                 continue
             break
-            
+
         # Basic URL validation
-        if not (url.startswith('http://') or url.startswith('https://')):
+        if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
             print(f"   Added https:// prefix: {url}")
-        
+
+        # Skip duplicates — every repeated URL would cost a full scrape
+        if url in seen:
+            print(f"   Already added, skipping: {url}")
+            continue
+        seen.add(url)
+
         urls.append(url)
         count += 1
     
@@ -374,19 +384,18 @@ def get_multiple_urls():
     return urls
 
 
-# ===== MAIN RUN FUNCTION =====
+# ===== BROWSER SETUP AND MAIN RUN FUNCTION =====
 
-def run(playwright, url, take_screenshot, url_index=None, total_urls=None):
-    """Main function to run the scraper with proper rendering"""
-    
-    # Show progress if multiple URLs
-    if url_index is not None and total_urls is not None:
-        print(f"\n Progress: URL {url_index}/{total_urls}")
-    
+async def create_browser_context(playwright):
+    """
+    Launch the browser once and create a context shared by all URLs
+
+    Reusing one browser/context across URLs avoids a fresh Chromium
+    startup per URL and keeps the HTTP/TLS/DNS caches warm between them.
+    """
     # Launch browser with better rendering settings
-    browser = playwright.chromium.launch(
-        headless=False, 
-        slow_mo=2000,
+    browser = await playwright.chromium.launch(
+        headless=False,
         args=[
             '--disable-blink-features=AutomationControlled',
             '--disable-web-security',
@@ -395,9 +404,9 @@ def run(playwright, url, take_screenshot, url_index=None, total_urls=None):
             '--window-size=1024,768'   # Smaller window size
         ]
     )
-    
+
     # Create context with smaller viewport
-    context = browser.new_context(
+    context = await browser.new_context(
         viewport={'width': 1024, 'height': 600},  # Smaller viewport
         user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         locale='en-US',
@@ -406,76 +415,92 @@ def run(playwright, url, take_screenshot, url_index=None, total_urls=None):
         reduced_motion='no-preference',
         forced_colors='none'
     )
-    
+
     # Minimal automation removal
-    context.add_init_script("""
+    await context.add_init_script("""
         Object.defineProperty(navigator, 'webdriver', {
             get: () => undefined
         });
     """)
-    
-    page = context.new_page()
-    
+
+    return browser, context
+
+
+async def run(context, url, take_screenshot, url_index=None, total_urls=None):
+    """Scrape one URL using a page from the shared browser context"""
+
+    # Show progress if multiple URLs
+    if url_index is not None and total_urls is not None:
+        print(f"\n Progress: URL {url_index}/{total_urls}")
+
+    page = await context.new_page()
+
     # Set default timeout
     page.set_default_timeout(60000)
-    
+
+    # When only text/metadata/links matter there is no point downloading
+    # every image and font; screenshots still need the full render
+    if not take_screenshot:
+        await page.route("**/*", __block_heavy_resources)
+
     # Go to URL
     print(f"\n Navigating to: {url}")
-    page.goto(url)
-    time.sleep(3)
-    
+    await page.goto(url)
+    await __wait_for_page_settled(page)
+
     # Handle authentication
-    if not auth_handler.handle_authentication(page, context, url, timeout=60):
+    if not await auth_handler.handle_authentication(page, context, url, timeout=60):
         print(" Could not authenticate. Exiting...")
-        browser.close()
+        await page.close()
         return
-    
+
     print(" Authentication successful! Proceeding with scraping...")
-    
+
     # Wait for page to be fully rendered
-    page.wait_for_load_state("domcontentloaded")
-    time.sleep(4)
-    
-    # Create main data folder for this URL
-    data_folder = __create_page_folder(page.title())
+    await __wait_for_page_settled(page)
+
+    # Fetch title/URL once — each access is a round-trip to the browser
+    title = await page.title()
+    current_url = page.url
+    base_filename = __safe_filename_from(title)
+
+    # Create the folders once up front — the helpers just receive paths
+    data_folder = Path(f"{base_filename}_data")
+    data_folder.mkdir(exist_ok=True)
     print(f"📁 Created data folder: {data_folder}/")
-    
+
     # Save page text
-    __save_page_text(page, "body", data_folder)
-    time.sleep(1)
-    
+    await __save_page_text(page, "body", data_folder, title, current_url)
+
     # Now scrape and save everything to the folder
     if take_screenshot:
-        screenshot_folder = __capture_multiple_screenshots(page)
+        screenshot_folder = Path(f"{base_filename}_screenshots")
+        screenshot_folder.mkdir(exist_ok=True)
+        await __capture_multiple_screenshots(page, screenshot_folder)
         print(f"📁 Screenshots saved in folder: {screenshot_folder}")
-    
-    headlines_found = __scrape_headlines(page, data_folder)
-    time.sleep(1)
-    
-    images = __scrape_images(page, url, data_folder)
-    time.sleep(1)
-    
-    metadata_found = __scrape_metadata(page, data_folder)
-    time.sleep(1)
-    
-    links_found = __scrape_all_links(page, url, data_folder)
+
+    # One DOM walk for headlines, metadata, images, and links
+    snapshot = await __snapshot_dom(page)
+
+    headlines_found = __scrape_headlines(snapshot['headlines'], data_folder)
+    images = __scrape_images(snapshot['images'], data_folder)
+    metadata_found = __scrape_metadata(snapshot['meta'], data_folder)
+    links_found = __scrape_all_links(snapshot['links'], url, data_folder)
     
     # Save a summary file
     summary = {
         'url': url,
-        'title': page.title(),
+        'title': title,
         'headlines_count': len(headlines_found),
         'images_count': len(images),
         'links_count': len(links_found['internal']) + len(links_found['external']),
-        'data_folder': data_folder,
-        'screenshot_folder': screenshot_folder if take_screenshot else None
+        'data_folder': str(data_folder),
+        'screenshot_folder': str(screenshot_folder) if take_screenshot else None
     }
     
-    summary_path = os.path.join(data_folder, "summary.json")
-    with open(summary_path, 'w', encoding='utf-8') as f:
-        json.dump(summary, f, indent=2, ensure_ascii=False)
+    summary_path = data_folder / "summary.json"
+    __write_json(summary, summary_path)
     
     print(f"\n📊 Summary saved to {summary_path}")
-    
-    context.close()
-    browser.close()
\ No newline at end of file
+
+    await page.close()
\ No newline at end of file